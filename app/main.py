@@ -1,12 +1,21 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
 from .config import settings
 from .database import Base, engine, get_db
 from . import models
+from .services.encoding import dumps
 from .routers import health
 
 app = FastAPI(title=settings.app_name)
 
+# 422 bodies echo the input; encode NaN/inf (rejected by allow_inf_nan=False) as null instead of failing
+@app.exception_handler(RequestValidationError)
+def validation_error(request: Request, exc: RequestValidationError):
+    body = dumps({"detail": jsonable_encoder(exc.errors())})
+    return Response(content=body, status_code=422, media_type="application/json")
+
 # Auto-create tables (Phase 2 deliverable)
 Base.metadata.create_all(bind=engine)
 
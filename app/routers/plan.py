@@ -1,12 +1,56 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Response
+from typing import Any, Dict, List, Tuple
+from functools import lru_cache
 from app.schemas import PlanGenerateIn, PlanGenerateOut
-from app.services.planner import build_program
+from app.services.planner import CATALOG_VERSION, DOUBLE_PROGRESSION, build_program, make_day
 from app.services.nutrition import macros, meal_templates
+from app.services.encoding import dumps, fragment
 
 router = APIRouter(prefix="/plan", tags=["plan"])
 
+# ---- response encoding (pre-encoded fragments) ----
+@lru_cache(maxsize=4096)
+def _cached_day_block(catalog_version: str, day_no: int, focus: str, picks: Tuple[Tuple[str, int], ...]) -> bytes:
+    # every workout field other than exercise/sets comes from DOUBLE_PROGRESSION
+    workout = make_day([{"exercise": name, "sets": sets} for name, sets in picks])
+    return dumps({"day": day_no, "focus": focus, "workout": workout})
+
+def _day_block(day: Dict[str, Any]) -> bytes:
+    picks = tuple((w["exercise"], w["sets"]) for w in day["workout"])
+    return _cached_day_block(CATALOG_VERSION, day["day"], day["focus"], picks)
+
+def encode_plan_response(prog: Dict[str, Any], nutrition: Dict[str, int], meals: List[Dict[str, Any]]) -> bytes:
+    """
+    Splice cached fragments into a PlanGenerateOut-shaped body.
+    `prog` must come from planner.build_program (trusted), so no output validation is done.
+    """
+    if prog["progression_model"] is DOUBLE_PROGRESSION:
+        progression = fragment("progression_model", DOUBLE_PROGRESSION)
+    else:
+        progression = dumps(prog["progression_model"])
+    parts = [
+        b'{"split":', fragment(("str", prog["split"]), prog["split"]),
+        b',"days":[', b",".join(_day_block(d) for d in prog["days"]), b"]",
+        b',"key_lifts":', fragment(("key_lifts", prog["split"], tuple(prog["key_lifts"])), prog["key_lifts"]),
+        b',"progression_model":', progression,
+        b',"why_split":', fragment(("str", prog["why_split"]), prog["why_split"]),
+        b',"why_substitution":', fragment(("str", prog["why_substitution"]), prog["why_substitution"]),
+    ]
+    for k in ("calories", "protein_g", "fat_g", "carb_g", "tdee"):
+        parts += (b',"', k.encode(), b'":', b"%d" % int(nutrition[k]))
+    # meal templates are static per name list
+    parts += (b',"meals":', fragment(("meals", tuple(m["name"] for m in meals)), meals))
+    parts += (b',"catalog_version":', fragment(("str", prog["catalog_version"]), prog["catalog_version"]), b"}")
+    return b"".join(parts)
+
+
 @router.post("/generate", response_model=PlanGenerateOut)
 def generate_plan(payload: PlanGenerateIn):
-    prog = build_program(payload.days_per_week, payload.equipment, payload.injuries)
+    try:
+        prog = build_program(payload.days_per_week, payload.equipment, payload.injuries, payload.session_minutes)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     m = macros(payload.goal, payload.sex, payload.age, payload.height_cm, payload.weight_kg, payload.days_per_week)
-    return {**prog, **m, "meals": meal_templates(m["calories"])}
\ No newline at end of file
+    # pre-encoded fragments; returning a Response skips response_model re-validation (schema still documented)
+    body = encode_plan_response(prog, m, meal_templates(m["calories"]))
+    return Response(content=body, media_type="application/json")
\ No newline at end of file
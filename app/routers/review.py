@@ -3,11 +3,12 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from typing import Optional, Dict, Any, List
 from datetime import datetime
-import json
 
 from app.database import get_db
 from sqlalchemy.orm import Session
 from app.models import Program, AdjustmentEvent
+from app.services.encoding import dumps_str, loads
+from app.services.planner import adjustment_key, legacy_set_adjustments
 
 router = APIRouter(prefix="/weekly-review", tags=["review"])
 
@@ -23,6 +24,9 @@ class WeeklyReviewIn(BaseModel):
     steps_avg: int                    # last 7d avg
     calories: int                     # current daily calories (from last plan)
 
+    class Config:
+        allow_inf_nan = False  # inputs are stored in AdjustmentEvent.payload_json; JSON has no NaN/inf
+
 class WeeklyReviewOut(BaseModel):
     coach_note: str
     adjustment: Dict[str, Any]
@@ -35,6 +39,7 @@ def _load_latest_program(db: Session, user_id: int) -> Program:
         db.query(Program)
         .filter(Program.user_id == user_id)
         .order_by(Program.created_at.desc())
+        .with_for_update()  # read-modify-write of plan_json; serializes with program regeneration
         .first()
     )
     return prog
@@ -62,6 +67,10 @@ def _mutate_sets(plan: dict, delta: int, max_targets: int = 2) -> List[str]:
         if new_sets != sets_val:
             ex["sets"] = new_sets
             changed.append(ex.get("exercise", f"day{day.get('day')}#0"))
+            # net delta per day/exercise so regenerated programs can re-apply it
+            key = adjustment_key(day.get("day"), ex.get("exercise"))
+            adj = plan.setdefault("set_adjustments", {})
+            adj[key] = adj.get(key, 0) + (new_sets - sets_val)
             count += 1
     return changed
 
@@ -74,9 +83,11 @@ def weekly_review(payload: WeeklyReviewIn, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="No program found for user. Generate a plan first.")
 
     try:
-        plan = json.loads(prog_row.plan_json)
+        plan = loads(prog_row.plan_json)
     except Exception:
         plan = {"days": []}
+    # always present after a review, so regeneration never has to infer it from set counts
+    plan.setdefault("set_adjustments", legacy_set_adjustments(plan))
 
     notes: List[str] = []
     adjustments: Dict[str, Any] = {"training": "maintain", "nutrition": "maintain"}
@@ -151,12 +162,12 @@ def weekly_review(payload: WeeklyReviewIn, db: Session = Depends(get_db)):
         "inputs": payload.dict(),
         "note": " ; ".join(notes),
     }
-    prog_row.plan_json = json.dumps(plan, ensure_ascii=False)
+    prog_row.plan_json = dumps_str(plan)
     db.add(prog_row)
 
     db.add(AdjustmentEvent(
         user_id=payload.user_id,
-        payload_json=json.dumps(changes, ensure_ascii=False),
+        payload_json=dumps_str(changes),
         reason="weekly_auto_adjust"
     ))
     db.commit()
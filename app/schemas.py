@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from typing import Optional, List, Any, Dict
 
 # ---- Users (Phase 1–2) ----
@@ -23,7 +23,7 @@ class PlanGenerateIn(BaseModel):
     height_cm: float
     weight_kg: float
     days_per_week: int
-    session_minutes: int
+    session_minutes: int = Field(gt=0, le=240)
     experience: str
     equipment: List[str] = []
     injuries: List[str] = []
@@ -40,4 +40,5 @@ class PlanGenerateOut(BaseModel):
     fat_g: int
     carb_g: int
     tdee: int
-    meals: List[Dict[str, Any]]
\ No newline at end of file
+    meals: List[Dict[str, Any]]
+    catalog_version: Optional[str] = None  # exercise catalog the program was built from
\ No newline at end of file
@@ -0,0 +1,43 @@
+from __future__ import annotations
+from typing import Any, Dict, Hashable
+import json, math
+
+try:
+    import orjson
+except ImportError:  # stdlib fallback (slower, same output shape)
+    orjson = None
+
+# ---- fast encoder ----
+def _finite(obj: Any) -> Any:
+    # orjson writes NaN/inf as null; the fallback must produce the same document
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(_finite(obj), ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+def dumps_str(obj: Any) -> str:
+    """For Text columns (e.g. Program.plan_json)."""
+    return dumps(obj).decode("utf-8")
+
+def loads(data: str | bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# ---- pre-encoded fragments ----
+_FRAGMENTS: Dict[Hashable, bytes] = {}
+
+def fragment(key: Hashable, obj: Any) -> bytes:
+    """Encode `obj` once per `key`; only for content that never changes for that key."""
+    b = _FRAGMENTS.get(key)
+    if b is None:
+        b = _FRAGMENTS[key] = dumps(obj)
+    return b
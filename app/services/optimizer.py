@@ -0,0 +1,411 @@
+from __future__ import annotations
+from typing import List, Dict, Any, Iterable, Tuple, Optional
+import time
+
+# Weekly hard sets per muscle (MVP defaults, roughly 6–10 sets/wk/muscle)
+WEEKLY_SET_TARGETS = {
+    "chest": 10, "lats": 10, "mid_back": 8, "delts": 8, "triceps": 6, "biceps": 6,
+    "quads": 10, "hamstrings": 8, "glutes": 6, "calves": 6, "core": 6,
+}
+
+# Muscles trained per day focus (each listed once; no duplicates)
+FOCUS_MUSCLES = {
+    "Upper": ["chest", "mid_back", "delts", "lats", "triceps", "biceps"],
+    "Lower": ["quads", "hamstrings", "glutes", "calves", "core"],
+    "Push": ["chest", "delts", "triceps"],
+    "Pull": ["lats", "mid_back", "biceps"],
+    "Legs": ["quads", "hamstrings", "glutes", "calves", "core"],
+}
+
+# Session time model (minutes)
+WARMUP_MINUTES = 5.0
+SETUP_MINUTES = 2.0        # per exercise: load bar / adjust machine
+MINUTES_PER_SET = 2.5      # work + rest for 6–10 reps @ RIR 1–2
+SET_OPTIONS = (2, 3, 4)    # sets per exercise when selected
+MAX_EXERCISES_PER_MUSCLE = 2  # candidates per muscle per session
+
+DEFAULT_SESSION_MINUTES = 60
+# search is capped by nodes so identical inputs always give identical programs;
+# the wall-clock deadline is only a safety net (None disables it)
+DEFAULT_NODE_BUDGET = 2000
+DEFAULT_DEADLINE_MS = 250.0
+
+# shortfall is squared (spread volume across muscles) and worse than junk volume
+SHORTFALL_WEIGHT = 2
+EXCESS_WEIGHT = 1
+
+
+def exercise_minutes(sets: int) -> float:
+    return SETUP_MINUTES + sets * MINUTES_PER_SET if sets else 0.0
+
+
+def split_sets(total: int) -> List[int]:
+    """Cheapest per-exercise split of one muscle's sets in a session (fewest exercises, even sets)."""
+    if not total:
+        return []
+    n = -(-total // max(SET_OPTIONS))
+    return [total // n + (1 if i < total % n else 0) for i in range(n)]
+
+
+def muscle_minutes(total: int) -> float:
+    return sum(exercise_minutes(s) for s in split_sets(total))
+
+
+_MUSCLE_MINUTES = [muscle_minutes(t) for t in range(max(SET_OPTIONS) * MAX_EXERCISES_PER_MUSCLE + 1)]
+
+
+def _max_sets_table(minutes: float) -> List[int]:
+    """table[h] = most sets that fit in h half-minutes (unbounded knapsack over whole exercises)."""
+    units = max(0, int(minutes * 2))
+    items = [(s, int(exercise_minutes(s) * 2)) for s in SET_OPTIONS]
+    table = [0] * (units + 1)
+    for h in range(units + 1):
+        for sets, cost in items:
+            if cost <= h and table[h - cost] + sets > table[h]:
+                table[h] = table[h - cost] + sets
+    return table
+
+
+def _candidates(
+    ex_pool: Iterable[Dict[str, Any]], focuses: List[str], deadline: Optional[float] = None,
+) -> Tuple[List[List[Tuple[Dict[str, Any], str]]], Optional[Dict[str, Any]], bool]:
+    """
+    Catalog-ordered candidates per day: up to MAX_EXERCISES_PER_MUSCLE distinct exercises per muscle.
+    Single pass that stops once every needed muscle is full, so `ex_pool` may be a lazy filter.
+    Also returns the first eligible exercise (fallback) and whether `deadline` cut the scan.
+    """
+    day_muscles = [FOCUS_MUSCLES.get(f, FOCUS_MUSCLES["Upper"]) for f in focuses]
+    by_muscle: Dict[str, List[Dict[str, Any]]] = {m: [] for ms in day_muscles for m in ms}
+    open_muscles = len(by_muscle)
+    first = None
+    seen = set()
+    cut = False
+    for i, e in enumerate(ex_pool):
+        # muscles with < MAX eligible exercises force a full scan; keep it under the deadline
+        if deadline is not None and i & 1023 == 1023 and time.monotonic() > deadline:
+            cut = True
+            break
+        if first is None:
+            first = e
+        bucket = by_muscle.get(e["muscle"])
+        if bucket is None or len(bucket) >= MAX_EXERCISES_PER_MUSCLE or e["name"] in seen:
+            continue
+        seen.add(e["name"])
+        bucket.append(e)
+        if len(bucket) == MAX_EXERCISES_PER_MUSCLE:
+            open_muscles -= 1
+            if not open_muscles:
+                break
+    return [[(e, m) for m in ms for e in by_muscle[m]] for ms in day_muscles], first, cut
+
+
+def _waterfill(deficit: List[int], cap: List[float], capacity: float) -> float:
+    """
+    min sum s^2 over shortfalls s = d - x, 0 <= x <= min(cap, d), sum x <= capacity
+    (continuous relaxation). The optimum levels the shortfalls: s = clamp(lam, d - u, d).
+    """
+    lo = [d - min(c, d) for c, d in zip(cap, deficit)]
+    need = sum(deficit) - capacity  # total shortfall at least this
+    g = sum(lo)
+    if g >= need:
+        return sum(x * x for x in lo)
+    # sweep lam upwards; sum clamp(lam, lo, hi) grows with slope = #muscles where lo < lam < hi
+    events = sorted([(x, 1) for x in lo] + [(float(d), -1) for d in deficit])
+    prev, slope, lam = events[0][0], 0, None
+    for p, delta in events:
+        if slope and g + slope * (p - prev) >= need:
+            lam = prev + (need - g) / slope
+            break
+        g += slope * (p - prev)
+        prev, slope = p, slope + delta
+    if lam is None:
+        lam = prev
+    return sum(min(max(lam, a), d) ** 2 for a, d in zip(lo, deficit))
+
+
+def _branch_and_bound(
+    var_day: List[int], var_mus: List[int], var_opts: List[Tuple[int, ...]], day_twin: List[int],
+    target: List[int], budget: float, limits: Dict[str, Any],
+) -> Tuple[List[int], int, bool]:
+    """
+    One independent component: vars are (day, muscle) -> total sets, ordered by day.
+    Minimizes weighted squared shortfall + excess with each day's minutes <= budget.
+    Returns (best totals per var, cost, stopped early).
+    """
+    n_vars, n_m, n_d = len(var_day), len(target), len(day_twin)
+    day_start = [0] * (n_d + 1)
+    for d in var_day:
+        day_start[d + 1] += 1
+    for d in range(n_d):
+        day_start[d + 1] += day_start[d]
+
+    # slots_left[k] = vars at k.. for the same muscle (incl. k); used to spread volume over the week
+    slots_left = [0] * n_vars
+    seen_count = [0] * n_m
+    for k in range(n_vars - 1, -1, -1):
+        seen_count[var_mus[k]] += 1
+        slots_left[k] = seen_count[var_mus[k]]
+
+    # set capacities: per muscle (remaining options) and per day (most sets that fit the time)
+    max_sets_in = _max_sets_table(budget - WARMUP_MINUTES)
+    day_sets_cap = max_sets_in[-1] if max_sets_in else 0
+    rest_of_day = [[0] * n_m for _ in range(n_vars + 1)]  # vars k.. up to the end of k's day
+    for k in range(n_vars - 1, -1, -1):
+        if k + 1 < n_vars and var_day[k + 1] == var_day[k]:
+            rest_of_day[k] = list(rest_of_day[k + 1])
+        rest_of_day[k][var_mus[k]] += var_opts[k][-1]
+    # future_cap[d][m] / future_day_cap[d] = capacity of days d.. (static)
+    future_cap = [[0] * n_m for _ in range(n_d + 1)]
+    future_day_cap = [0] * (n_d + 1)
+    for d in range(n_d - 1, -1, -1):
+        cap = rest_of_day[day_start[d]]
+        future_cap[d] = [a + min(b, day_sets_cap) for a, b in zip(future_cap[d + 1], cap)]
+        future_day_cap[d] = future_day_cap[d + 1] + day_sets_cap
+
+    have = [0] * n_m
+    day_used = [WARMUP_MINUTES] * n_d
+    assign = [0] * n_vars
+    best = {"cost": float("inf"), "assign": [0] * n_vars}
+    stopped = [False]
+    deadline = limits["deadline"]
+
+    def bound(k: int) -> float:
+        # relaxation: remaining sets limited by the days' time (shared by all muscles) and by
+        # each muscle's remaining options; the shortfall is water-filled over that capacity
+        d = var_day[k]
+        free_today = max_sets_in[max(0, int((budget - day_used[d]) * 2))]
+        today, fut = rest_of_day[k], future_cap[d + 1]
+        lb = 0.0
+        defs, caps = [], []
+        for i in range(n_m):
+            diff = target[i] - have[i]
+            if diff < 0:
+                lb -= EXCESS_WEIGHT * diff
+            elif diff > 0:
+                defs.append(diff)
+                caps.append(min(today[i], free_today) + fut[i])
+        if defs:
+            lb += SHORTFALL_WEIGHT * _waterfill(defs, caps, free_today + future_day_cap[d + 1])
+        return lb
+
+    def muscle_cost(i: int, total: int) -> int:
+        diff = target[i] - total
+        return SHORTFALL_WEIGHT * diff * diff if diff > 0 else -EXCESS_WEIGHT * diff
+
+    def cost() -> int:
+        return sum(muscle_cost(i, have[i]) for i in range(n_m))
+
+    def sol_cost(sol: List[int]) -> int:
+        tot = [0] * n_m
+        for k, s in enumerate(sol):
+            tot[var_mus[k]] += s
+        return sum(muscle_cost(i, tot[i]) for i in range(n_m))
+
+    def improve(sol: List[int]) -> List[int]:
+        # hill-climb the first (greedy) incumbent with single and same-day pair changes;
+        # a strong early incumbent is what lets the bound prune
+        sol = list(sol)
+        tot = [0] * n_m
+        used = [WARMUP_MINUTES] * n_d
+        for k, s in enumerate(sol):
+            tot[var_mus[k]] += s
+            used[var_day[k]] += _MUSCLE_MINUTES[s]
+        improved = True
+        while improved:
+            improved = False
+            for d in range(n_d):
+                for a in range(day_start[d], day_start[d + 1]):
+                    for b in range(a, day_start[d + 1]):
+                        ma, mb = var_mus[a], var_mus[b]
+                        base = used[d] - _MUSCLE_MINUTES[sol[a]] - (_MUSCLE_MINUTES[sol[b]] if b != a else 0)
+                        cur = muscle_cost(ma, tot[ma]) + (muscle_cost(mb, tot[mb]) if b != a else 0)
+                        for sa in var_opts[a]:
+                            for sb in (var_opts[b] if b != a else (sa,)):
+                                mins = base + _MUSCLE_MINUTES[sa] + (_MUSCLE_MINUTES[sb] if b != a else 0)
+                                if mins > budget and (sa or sb):
+                                    continue
+                                new = muscle_cost(ma, tot[ma] - sol[a] + sa)
+                                if b != a:
+                                    new += muscle_cost(mb, tot[mb] - sol[b] + sb)
+                                if new < cur:
+                                    tot[ma] += sa - sol[a]
+                                    sol[a] = sa
+                                    if b != a:
+                                        tot[mb] += sb - sol[b]
+                                        sol[b] = sb
+                                    used[d] = mins
+                                    base = used[d] - _MUSCLE_MINUTES[sol[a]] - (_MUSCLE_MINUTES[sol[b]] if b != a else 0)
+                                    cur = new
+                                    improved = True
+        return sol
+
+    def search(k: int) -> None:
+        limits["nodes"] += 1
+        # limits only apply once an incumbent exists (the first dive is greedy)
+        if best["cost"] != float("inf") and (
+            limits["nodes"] > limits["node_budget"]
+            or (deadline is not None and limits["nodes"] & 255 == 0 and time.monotonic() > deadline)
+        ):
+            stopped[0] = True
+            return
+        if k == n_vars:
+            c = cost()
+            first = best["cost"] == float("inf")
+            if c < best["cost"]:
+                best["cost"], best["assign"] = c, list(assign)
+            if first:
+                polished = improve(assign)
+                c = sol_cost(polished)
+                if c < best["cost"]:
+                    best["cost"], best["assign"] = c, polished
+            return
+        # costs are integers: a subtree can only improve if its bound is <= best - 1
+        if bound(k) > best["cost"] - 1 + 1e-9:
+            return
+        d, m = var_day[k], var_mus[k]
+        # identical days are interchangeable: keep a twin's vector <= the earlier day's (lexicographic)
+        limit = var_opts[k][-1]
+        t = day_twin[d]
+        if t >= 0:
+            j = k - day_start[d]
+            if all(assign[day_start[d] + i] == assign[day_start[t] + i] for i in range(j)):
+                limit = assign[day_start[t] + j]
+        deficit = target[m] - have[m]
+        if deficit <= 0:
+            options = var_opts[k]
+        else:
+            share = deficit / slots_left[k]
+            options = sorted(var_opts[k], key=lambda s: (abs(share - s), -s))
+        for s in options:
+            mins = _MUSCLE_MINUTES[s]
+            if s > limit or (s and day_used[d] + mins > budget):
+                continue
+            assign[k] = s
+            have[m] += s
+            day_used[d] += mins
+            search(k + 1)
+            day_used[d] -= mins
+            have[m] -= s
+            assign[k] = 0
+            if stopped[0]:
+                return
+
+    search(0)
+    return best["assign"], best["cost"], stopped[0]
+
+
+def optimize_program(
+    ex_pool: Iterable[Dict[str, Any]],
+    focuses: List[str],
+    session_minutes: Optional[int] = None,
+    deadline_ms: Optional[float] = DEFAULT_DEADLINE_MS,
+    targets: Optional[Dict[str, int]] = None,
+    node_budget: int = DEFAULT_NODE_BUDGET,
+) -> Dict[str, Any]:
+    """
+    Picks sets per (day, muscle) to minimize weighted squared weekly shortfall + excess vs
+    `targets`, with each day fitting `session_minutes`; sets are spread over the muscle's
+    catalog-ordered candidates (split_sets). Muscles that never share a day are independent,
+    so each component is solved by its own branch-and-bound. The search stops after
+    `node_budget` nodes (deterministic) or, as a safety net, at `deadline_ms`.
+    Raises ValueError when nothing in `ex_pool` is eligible or `session_minutes` <= 0.
+    """
+    if session_minutes is not None and session_minutes <= 0:
+        raise ValueError("session_minutes must be positive.")
+    budget = float(DEFAULT_SESSION_MINUTES if session_minutes is None else session_minutes)
+    targets = targets or WEEKLY_SET_TARGETS
+    started = time.monotonic()
+    deadline = None if deadline_ms is None else started + deadline_ms / 1000.0
+    limits = {"nodes": 0, "node_budget": node_budget, "deadline": deadline}
+
+    day_cands, first_eligible, scan_cut = _candidates(ex_pool, focuses, deadline)
+    if first_eligible is None:
+        raise ValueError("No exercise in the catalog matches the given equipment and injuries.")
+    # no day can use more than warm-up + every candidate at max sets; capping here keeps
+    # _max_sets_table (O(minutes)) bounded for huge session_minutes
+    most_cands = max((len(c) for c in day_cands), default=0)
+    budget = min(budget, WARMUP_MINUTES + most_cands * exercise_minutes(max(SET_OPTIONS)))
+    # per day: muscle -> its candidates (FOCUS_MUSCLES order)
+    day_groups: List[Dict[str, List[Dict[str, Any]]]] = []
+    for cands in day_cands:
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for e, m in cands:
+            groups.setdefault(m, []).append(e)
+        day_groups.append(groups)
+
+    # components: muscles joined by a shared day (union-find)
+    muscles = sorted({m for g in day_groups for m in g} | set(targets))
+    parent = {m: m for m in muscles}
+
+    def find(m: str) -> str:
+        while parent[m] != m:
+            parent[m] = parent[parent[m]]
+            m = parent[m]
+        return m
+
+    for g in day_groups:
+        ms = list(g)
+        for m in ms[1:]:
+            parent[find(m)] = find(ms[0])
+
+    totals: List[Dict[str, int]] = [{} for _ in focuses]
+    stopped = False
+    for root in sorted({find(m) for m in muscles}, key=muscles.index):
+        comp_muscles = [m for m in muscles if find(m) == root]
+        days = [d for d, g in enumerate(day_groups) if g and find(next(iter(g))) == root]
+        # cost only depends on weekly totals, so search the most crowded days first
+        days.sort(key=lambda d: -len(day_groups[d]))
+        midx = {m: i for i, m in enumerate(comp_muscles)}
+        var_day, var_mus, var_opts, var_key = [], [], [], []
+        for local, d in enumerate(days):
+            for m, exs in day_groups[d].items():
+                var_day.append(local)
+                var_mus.append(midx[m])
+                var_opts.append((0,) + tuple(range(min(SET_OPTIONS), max(SET_OPTIONS) * len(exs) + 1)))
+                var_key.append((d, m))
+        twins = [-1] * len(days)
+        for i in range(len(days)):
+            for j in range(i - 1, -1, -1):
+                if focuses[days[j]] == focuses[days[i]]:
+                    twins[i] = j
+                    break
+        assign, _, cut = _branch_and_bound(
+            var_day, var_mus, var_opts, twins, [targets.get(m, 0) for m in comp_muscles], budget, limits,
+        )
+        stopped = stopped or cut
+        for (d, m), s in zip(var_key, assign):
+            totals[d][m] = s
+
+    days_out = []
+    fallback_days = []
+    for d, groups in enumerate(day_groups):
+        picks = []
+        for m, exs in groups.items():
+            for e, s in zip(exs, split_sets(totals[d].get(m, 0))):
+                picks.append({"exercise": e["name"], "muscle": m, "sets": s})
+        if not picks:
+            # nothing fits (no eligible exercise for this focus, or a session shorter than
+            # warm-up + one exercise): never return an empty day
+            e = day_cands[d][0][0] if day_cands[d] else first_eligible
+            picks.append({"exercise": e["name"], "muscle": e["muscle"], "sets": min(SET_OPTIONS)})
+            fallback_days.append(d)
+        days_out.append(picks)
+
+    weekly = dict.fromkeys(muscles, 0)
+    for picks in days_out:
+        for p in picks:
+            weekly[p["muscle"]] = weekly.get(p["muscle"], 0) + p["sets"]
+    total_cost = 0
+    for m, sets in weekly.items():
+        diff = targets.get(m, 0) - sets
+        total_cost += SHORTFALL_WEIGHT * diff * diff if diff > 0 else -EXCESS_WEIGHT * diff
+
+    return {
+        "days": days_out,
+        "weekly_sets": weekly,
+        "cost": total_cost,
+        "optimal": not stopped and not scan_cut and not fallback_days,
+        "fallback_days": fallback_days,
+        "nodes": limits["nodes"],
+        "elapsed_ms": round((time.monotonic() - started) * 1000.0, 3),
+    }
@@ -1,22 +1,37 @@
 from __future__ import annotations
-from typing import List, Dict, Any
-import json, os
+from typing import List, Dict, Any, Iterator, Optional
+import hashlib, json, os
+
+from app.services.optimizer import optimize_program, DEFAULT_DEADLINE_MS
 
 # Load exercise pool once
 DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "exercises.json")
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    EX_POOL = json.load(f)["exercises"]
+with open(DATA_PATH, "rb") as f:
+    _raw = f.read()
+EX_POOL = json.loads(_raw)["exercises"]
+# content hash; keys cached response fragments so catalog edits invalidate them
+CATALOG_VERSION = hashlib.sha1(_raw).hexdigest()[:12]
 
 SPLIT_RULES = {2: "UL", 3: "PPL", 4: "ULx2", 5: "PPL+UL", 6: "PPLx2"}
 
+SCHEDULES = {
+    "UL": ["Upper", "Lower"],
+    "ULx2": ["Upper", "Lower", "Upper", "Lower"],
+    "PPL": ["Push", "Pull", "Legs"],
+    "PPL+UL": ["Push", "Pull", "Legs", "Upper", "Lower"],
+    "PPLx2": ["Push", "Pull", "Legs", "Push", "Pull", "Legs"],
+}
+
+# set counts come from the optimizer per exercise, so nothing here fixes them
 DOUBLE_PROGRESSION = {
-    "sets": 3,
     "reps_min": 6,
     "reps_max": 10,
     "rir": "1-2",
-    "note": "Double progression: 3x6–10 @ RIR 1–2; when all sets hit 10, add 2.5–5kg next time."
+    "note": "Double progression: 6–10 reps per set @ RIR 1–2; when all sets hit 10, add 2.5–5kg next time."
 }
 
+LEGACY_FLAT_SETS = 3  # sets per exercise in programs built before the optimizer
+
 KEY_LIFTS = {
     "UL": ["Barbell Bench Press", "Barbell Back Squat"],
     "ULx2": ["Barbell Bench Press", "Barbell Back Squat"],
@@ -25,62 +40,66 @@ KEY_LIFTS = {
     "PPLx2": ["Barbell Bench Press", "Romanian Deadlift"],
 }
 
-def filter_exercises(user_equipment: List[str], injuries: List[str]) -> List[Dict[str, Any]]:
+def iter_exercises(user_equipment: List[str], injuries: List[str],
+                   pool: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
     def ok(ex):
         equip_ok = (not user_equipment) or any(e in user_equipment for e in ex.get("equipment", []))
         inj_ok = not any(tag in injuries for tag in ex.get("injury_exclude", []))
         return equip_ok and inj_ok
-    return [e for e in EX_POOL if ok(e)]
-
-def pick(ex_pool: List[Dict[str, Any]], muscle: str) -> str:
-    for e in ex_pool:
-        if e["muscle"] == muscle:
-            return e["name"]
-    return ex_pool[0]["name"] if ex_pool else "Bodyweight Squat"
-
-def make_day(ex_pool, focus: str) -> List[Dict[str, Any]]:
-    if focus == "Upper":
-        muscles = ["chest", "mid_back", "delts", "lats", "triceps", "biceps"]
-    elif focus == "Lower":
-        muscles = ["quads", "hamstrings", "glutes", "calves", "core"]
-    elif focus == "Push":
-        muscles = ["chest", "delts", "triceps", "chest"]
-    elif focus == "Pull":
-        muscles = ["lats", "mid_back", "biceps", "mid_back"]
-    else:  # Legs
-        muscles = ["quads", "hamstrings", "glutes", "calves", "core"]
+    return (e for e in (EX_POOL if pool is None else pool) if ok(e))
+
+def filter_exercises(user_equipment: List[str], injuries: List[str],
+                     pool: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+    return list(iter_exercises(user_equipment, injuries, pool))
 
+def make_day(picks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     day = []
-    for m in muscles:
-        ex_name = pick(ex_pool, m)
+    for p in picks:
         day.append({
-            "exercise": ex_name,
-            "sets": DOUBLE_PROGRESSION["sets"],
+            "exercise": p["exercise"],
+            "sets": p["sets"],
             "reps": f"{DOUBLE_PROGRESSION['reps_min']}-{DOUBLE_PROGRESSION['reps_max']}",
             "RIR": DOUBLE_PROGRESSION["rir"],
             "progression": DOUBLE_PROGRESSION["note"],
         })
     return day
 
-def build_program(days_per_week: int, equipment: List[str], injuries: List[str]) -> Dict[str, Any]:
+def adjustment_key(day: Any, exercise: Any) -> str:
+    """Key for plan["set_adjustments"] (net review-applied set delta per day/exercise)."""
+    return f"{day}:{exercise}"
+
+def legacy_set_adjustments(plan: Dict[str, Any]) -> Dict[str, int]:
+    """
+    set_adjustments for plans stored before it existed. Only pre-optimizer plans qualify:
+    they were generated at a flat LEGACY_FLAT_SETS and review only touches the first
+    movement of a day, so any other set count means the plan is not one of them.
+    """
+    flat = LEGACY_FLAT_SETS
+    days = plan.get("days") or []
+    if "catalog_version" in plan or any(
+        w.get("sets", flat) != flat for d in days for w in (d.get("workout") or [])[1:]
+    ):
+        return {}
+    adj = {}
+    for day in days:
+        workout = day.get("workout") or []
+        if workout and workout[0].get("sets", flat) != flat:
+            adj[adjustment_key(day.get("day"), workout[0].get("exercise"))] = workout[0]["sets"] - flat
+    return adj
+
+def build_program(days_per_week: int, equipment: List[str], injuries: List[str],
+                  session_minutes: Optional[int] = None,
+                  deadline_ms: Optional[float] = DEFAULT_DEADLINE_MS) -> Dict[str, Any]:
     split = SPLIT_RULES.get(days_per_week, "PPL")
-    ex_pool = filter_exercises(equipment, injuries)
-
-    if split == "UL":
-        schedule = [{"day": 1, "focus": "Upper"}, {"day": 2, "focus": "Lower"}]
-    elif split == "ULx2":
-        schedule = [{"day": 1, "focus": "Upper"}, {"day": 2, "focus": "Lower"},
-                    {"day": 3, "focus": "Upper"}, {"day": 4, "focus": "Lower"}]
-    elif split == "PPL":
-        schedule = [{"day": 1, "focus": "Push"}, {"day": 2, "focus": "Pull"}, {"day": 3, "focus": "Legs"}]
-    elif split == "PPL+UL":
-        schedule = [{"day": 1, "focus": "Push"}, {"day": 2, "focus": "Pull"}, {"day": 3, "focus": "Legs"},
-                    {"day": 4, "focus": "Upper"}, {"day": 5, "focus": "Lower"}]
-    else:  # PPLx2
-        schedule = [{"day": 1, "focus": "Push"}, {"day": 2, "focus": "Pull"}, {"day": 3, "focus": "Legs"},
-                    {"day": 4, "focus": "Push"}, {"day": 5, "focus": "Pull"}, {"day": 6, "focus": "Legs"}]
-
-    days = [{"day": s["day"], "focus": s["focus"], "workout": make_day(ex_pool, s["focus"])} for s in schedule]
+    # lazy: the optimizer stops scanning once it has enough candidates per muscle
+    ex_pool = iter_exercises(equipment, injuries)
+
+    schedule = [{"day": i + 1, "focus": f} for i, f in enumerate(SCHEDULES[split])]
+
+    # exercise + set selection: weekly volume targets within the session time budget
+    opt = optimize_program(ex_pool, [s["focus"] for s in schedule], session_minutes, deadline_ms)
+    days = [{"day": s["day"], "focus": s["focus"], "workout": make_day(picks)}
+            for s, picks in zip(schedule, opt["days"])]
 
     return {
         "split": split,
@@ -89,4 +108,5 @@ def build_program(days_per_week: int, equipment: List[str], injuries: List[str])
         "why_split": "2→UL, 3→PPL, 4→ULx2, 5–6→PPL varyasyonları; toparlanma/volüm dengesine göre ölçeklenir.",
         "why_substitution": "Ekipman/yaralanma filtreleri ile güvenli alternatifler seçildi (örn. omuz sorunu → DB/Machine press).",
         "progression_model": DOUBLE_PROGRESSION,
+        "catalog_version": CATALOG_VERSION,
     }
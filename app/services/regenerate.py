@@ -0,0 +1,265 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import json, sys, time
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Onboarding, Program
+from app.services.encoding import dumps_str, loads
+from app.services.planner import (
+    CATALOG_VERSION, EX_POOL, adjustment_key, build_program, legacy_set_adjustments,
+)
+
+# (days_per_week, session_minutes, equipment, injuries) — the optimizer is node-budgeted, so
+# with no wall-clock deadline identical keys build identical programs
+ProfileKey = Tuple[Optional[int], Optional[int], Tuple[str, ...], Tuple[str, ...]]
+
+MIN_SETS = 2  # same floor as review._mutate_sets
+
+# ---------- catalog diff ----------
+def diff_catalogs(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Keys whose users may get a different program under `new`:
+      injuries  - injury tags added/removed on an exercise
+      equipment - equipment added/removed on an exercise, or equipment of an exercise
+                  that was added/removed/moved to another muscle/reordered
+      muscles   - muscles with any change (reporting)
+      membership- True if an exercise appeared/disappeared for users with no equipment filter
+    """
+    old_by = {e["name"]: e for e in old}
+    new_by = {e["name"]: e for e in new}
+    keys: Dict[str, Any] = {"equipment": set(), "injuries": set(), "muscles": set(), "membership": False}
+
+    def touch_all(e: Dict[str, Any]) -> None:
+        keys["equipment"].update(e.get("equipment", []))
+        keys["muscles"].add(e["muscle"])
+        keys["membership"] = True
+
+    for name in old_by.keys() | new_by.keys():
+        a, b = old_by.get(name), new_by.get(name)
+        if a == b:
+            continue
+        if a is None or b is None or a["muscle"] != b["muscle"]:
+            for e in (a, b):
+                if e:
+                    touch_all(e)
+            continue
+        keys["muscles"].add(a["muscle"])
+        keys["equipment"] |= set(a.get("equipment", [])) ^ set(b.get("equipment", []))
+        keys["injuries"] |= set(a.get("injury_exclude", [])) ^ set(b.get("injury_exclude", []))
+
+    # catalog order is selection preference: a reorder within a muscle changes picks
+    for m in {e["muscle"] for e in old} | {e["muscle"] for e in new}:
+        old_order = [e["name"] for e in old if e["muscle"] == m and e["name"] in new_by]
+        new_order = [e["name"] for e in new if e["muscle"] == m and e["name"] in old_by]
+        if old_order != new_order:
+            for e in new:
+                if e["name"] in old_order:
+                    touch_all(e)
+    return keys
+
+def parse_list(text: Optional[str]) -> List[str]:
+    """Onboarding.equipment/injuries are stored as a JSON list or comma-separated text."""
+    if not text:
+        return []
+    try:
+        val = json.loads(text)
+        if isinstance(val, list):
+            return [str(v).strip() for v in val if str(v).strip()]
+    except ValueError:
+        pass
+    return [v.strip() for v in text.split(",") if v.strip()]
+
+def profile_hits(equipment: List[str], injuries: List[str], keys: Dict[str, Any]) -> bool:
+    if keys["injuries"] & set(injuries):
+        return True
+    if keys["equipment"] & set(equipment):
+        return True
+    # no equipment filter → every exercise is eligible
+    return not equipment and keys["membership"]
+
+def _onboarding_filter(keys: Dict[str, Any]):
+    """Coarse SQL prefilter (LIKE on the stored text); profile_hits() makes the exact call."""
+    conds = [Onboarding.injuries.contains(k, autoescape=True) for k in sorted(keys["injuries"])]
+    conds += [Onboarding.equipment.contains(k, autoescape=True) for k in sorted(keys["equipment"])]
+    if keys["membership"]:
+        conds += [Onboarding.equipment.is_(None), Onboarding.equipment.in_(["", "[]"])]
+    return or_(*conds) if conds else None
+
+# ---------- rebuild ----------
+def profile_key(ob: Any) -> ProfileKey:
+    return (ob.days_per_week, ob.session_minutes,
+            tuple(sorted(parse_list(ob.equipment))), tuple(sorted(parse_list(ob.injuries))))
+
+def _build(key: ProfileKey, deadline_ms: Optional[float]) -> Optional[Dict[str, Any]]:
+    days, minutes, equipment, injuries = key
+    try:
+        return build_program(days or 0, list(equipment), list(injuries), minutes, deadline_ms)
+    except ValueError:
+        return None  # nothing in the new catalog fits this profile
+
+def merge_plan(old_plan: Dict[str, Any], prog: Dict[str, Any]) -> Dict[str, Any]:
+    """New program over the stored plan: keeps nutrition/review metadata and re-applies set adjustments."""
+    plan = {**old_plan, **prog}
+    plan["days"] = [{**d, "workout": [dict(w) for w in d["workout"]]} for d in prog["days"]]
+    adj = old_plan["set_adjustments"] if "set_adjustments" in old_plan else legacy_set_adjustments(old_plan)
+    kept = {}
+    for day in plan["days"]:
+        for ex in day["workout"]:
+            k = adjustment_key(day["day"], ex["exercise"])
+            if adj.get(k):
+                ex["sets"] = max(MIN_SETS, ex["sets"] + adj[k])
+                kept[k] = adj[k]
+    # adjustments for exercises that were swapped out are dropped
+    plan["set_adjustments"] = kept
+    return plan
+
+def _latest_programs(db: Session, user_ids: List[int]) -> Dict[int, Tuple[int, str]]:
+    latest = (
+        select(Program.user_id, func.max(Program.created_at).label("ts"))
+        .where(Program.user_id.in_(user_ids))
+        .group_by(Program.user_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(Program.id, Program.user_id, Program.plan_json)
+        .join(latest, and_(Program.user_id == latest.c.user_id, Program.created_at == latest.c.ts))
+        .order_by(Program.id)
+    )
+    return {uid: (pid, plan_json) for pid, uid, plan_json in rows}  # created_at ties → highest id
+
+# conditional write: a row changed since it was read (e.g. by /weekly-review) is not overwritten
+_WRITE_IF_UNCHANGED = (
+    update(Program.__table__)
+    .where(Program.__table__.c.id == bindparam("b_id"),
+           Program.__table__.c.plan_json == bindparam("b_old"))
+    .values(split=bindparam("b_split"), plan_json=bindparam("b_plan"))
+)
+WRITE_ATTEMPTS = 3  # read-merge-write rounds per chunk before a row is reported as a conflict
+
+def _plan_updates(progs: Dict[int, Tuple[int, str]], hits: Dict[int, ProfileKey],
+                  built: Dict[ProfileKey, Optional[Dict[str, Any]]], stats: Dict[str, Any]) -> List[Dict[str, Any]]:
+    updates = []
+    for uid, (pid, plan_json) in progs.items():
+        if built[hits[uid]] is None:
+            stats["infeasible"] += 1  # keep the stored program
+            continue
+        try:
+            old_plan = loads(plan_json)
+        except ValueError:
+            old_plan = {}
+        if old_plan.get("catalog_version") == CATALOG_VERSION:
+            stats["unchanged"] += 1  # already regenerated (re-run after a partial run)
+            continue
+        new_plan = merge_plan(old_plan, built[hits[uid]])
+        if new_plan.get("days") == old_plan.get("days"):
+            stats["unchanged"] += 1
+            continue
+        # days_per_week may now map to another split: keep the column in sync
+        updates.append({"uid": uid, "b_id": pid, "b_old": plan_json,
+                        "b_split": new_plan["split"], "b_plan": dumps_str(new_plan)})
+    return updates
+
+def _lost_writes(db: Session, updates: List[Dict[str, Any]]) -> List[int]:
+    """User ids whose row does not hold the new plan (executemany rowcount is not per row)."""
+    current = dict(db.execute(select(Program.id, Program.plan_json)
+                              .where(Program.id.in_([u["b_id"] for u in updates]))).all())
+    return [u["uid"] for u in updates if current.get(u["b_id"]) != u["b_plan"]]
+
+# ---------- pipeline ----------
+def regenerate(
+    session_factory: Callable[[], Session],
+    old_catalog: List[Dict[str, Any]],
+    dry_run: bool = False,
+    chunk_size: int = 2000,
+    workers: int = 1,
+    max_rate: float = 0.0,
+    deadline_ms: Optional[float] = None,
+    log: Callable[[str], None] = lambda msg: print(msg, file=sys.stderr),
+) -> Dict[str, Any]:
+    """
+    Rebuild stored programs of users affected by changes from `old_catalog` to the
+    loaded catalog (app/data/exercises.json, what build_program uses). Rows are
+    keyset-paginated by user_id and each chunk is written in one transaction.
+    Writes only apply if plan_json is still what was read; rows a concurrent review changed
+    are merged again in a follow-up transaction (up to WRITE_ATTEMPTS rounds) and otherwise
+    counted as "conflicts".
+    `max_rate` (users/s, 0 = unlimited) throttles the scan. `deadline_ms` defaults to None so
+    results depend only on the node budget, never on machine load.
+    """
+    keys = diff_catalogs(old_catalog, EX_POOL)
+    stats = {"scanned": 0, "affected": 0, "unique_keys": 0, "written": 0,
+             "unchanged": 0, "no_program": 0, "infeasible": 0, "conflicts": 0, "dry_run": dry_run,
+             "keys": {k: sorted(v) if isinstance(v, set) else v for k, v in keys.items()}}
+    where = _onboarding_filter(keys)
+    if where is None:
+        log("[regen] catalog diff is empty — nothing to do")
+        return stats
+
+    built: Dict[ProfileKey, Dict[str, Any]] = {}
+    build = partial(_build, deadline_ms=deadline_ms)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    started = time.monotonic()
+    last_id = 0
+    try:
+        while True:
+            with session_factory() as db:
+                obs = db.execute(
+                    select(Onboarding).where(where, Onboarding.user_id > last_id)
+                    .order_by(Onboarding.user_id).limit(chunk_size)
+                ).scalars().all()
+                if not obs:
+                    break
+                last_id = obs[-1].user_id
+                stats["scanned"] += len(obs)
+
+                hits = {ob.user_id: profile_key(ob) for ob in obs
+                        if profile_hits(parse_list(ob.equipment), parse_list(ob.injuries), keys)}
+                stats["affected"] += len(hits)
+
+                # dedupe: each distinct profile is built once for the whole run
+                todo = sorted({k for k in hits.values() if k not in built}, key=repr)
+                if todo:
+                    chunks = max(1, len(todo) // (workers * 4)) if pool else 1
+                    results = pool.map(build, todo, chunksize=chunks) if pool else map(build, todo)
+                    built.update(zip(todo, results))
+                    stats["unique_keys"] = len(built)
+
+                pending = hits
+                for attempt in range(WRITE_ATTEMPTS):
+                    progs = _latest_programs(db, list(pending)) if pending else {}
+                    if attempt == 0:
+                        stats["no_program"] += len(hits) - len(progs)
+                    updates = _plan_updates(progs, hits, built, stats)
+                    if not updates or dry_run:
+                        stats["written"] += len(updates)
+                        break
+                    db.execute(_WRITE_IF_UNCHANGED, updates)
+                    lost = _lost_writes(db, updates)
+                    db.commit()  # release row locks before re-reading the rows that moved
+                    stats["written"] += len(updates) - len(lost)
+                    # a review changed these rows since they were read: merge again from the new row
+                    pending = {uid: hits[uid] for uid in lost}
+                    if not pending:
+                        break
+                else:
+                    stats["conflicts"] += len(pending)
+
+            elapsed = time.monotonic() - started
+            log(f"[regen] scanned={stats['scanned']} affected={stats['affected']} "
+                f"keys={stats['unique_keys']} {'would_write' if dry_run else 'written'}={stats['written']} "
+                f"unchanged={stats['unchanged']} infeasible={stats['infeasible']} "
+                f"conflicts={stats['conflicts']} rate={stats['scanned'] / max(elapsed, 1e-9):.0f}/s")
+            if max_rate > 0:
+                # hold the scan at max_rate users/s
+                ahead = stats["scanned"] / max_rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    finally:
+        if pool:
+            pool.shutdown()
+    stats["elapsed_s"] = round(time.monotonic() - started, 3)
+    return stats
@@ -0,0 +1,76 @@
+"""
+Latency benchmark for the program optimizer across catalog sizes.
+
+    python3 scripts/bench_planner.py [--requests 200] [--node-budget 2000]
+
+The default first size is app/data/exercises.json itself; other sizes are
+synthetic catalogs built by cloning it with renamed entries and shuffled
+equipment/injury tags. Each request runs the full filter + optimize path
+with a random profile. "optimal" is the share of requests whose search
+finished inside the node budget (infeasible profiles, i.e. no eligible
+exercise at all, are skipped).
+"""
+from __future__ import annotations
+import argparse, os, random, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.planner import EX_POOL, SPLIT_RULES, SCHEDULES, iter_exercises  # noqa: E402
+from app.services.optimizer import optimize_program, DEFAULT_DEADLINE_MS, DEFAULT_NODE_BUDGET  # noqa: E402
+
+EQUIPMENT = sorted({e for ex in EX_POOL for e in ex["equipment"]})
+INJURIES = sorted({i for ex in EX_POOL for i in ex["injury_exclude"]})
+
+
+def synthetic_catalog(size: int, rng: random.Random):
+    out = []
+    for i in range(size):
+        base = EX_POOL[i % len(EX_POOL)]
+        out.append({
+            "name": f"{base['name']} #{i}",
+            "muscle": base["muscle"],
+            "equipment": rng.sample(EQUIPMENT, rng.randint(1, 2)),
+            "injury_exclude": rng.sample(INJURIES, rng.randint(0, 2)),
+        })
+    return out
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default=f"{len(EX_POOL)},200,1000,5000,20000",
+                    help=f"catalog sizes; {len(EX_POOL)} (the default first size) is the real catalog")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--deadline-ms", type=float, default=DEFAULT_DEADLINE_MS)
+    ap.add_argument("--node-budget", type=int, default=DEFAULT_NODE_BUDGET)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'catalog':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'optimal':>8}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        catalog = EX_POOL if size == len(EX_POOL) else synthetic_catalog(size, rng)
+        lat, optimal = [], 0
+        for _ in range(args.requests):
+            days = rng.randint(2, 6)
+            equipment = rng.sample(EQUIPMENT, rng.randint(0, len(EQUIPMENT)))
+            injuries = rng.sample(INJURIES, rng.randint(0, 2))
+            minutes = rng.choice([30, 45, 60, 75, 90])
+            t0 = time.perf_counter()
+            pool = iter_exercises(equipment, injuries, pool=catalog)
+            try:
+                res = optimize_program(pool, SCHEDULES[SPLIT_RULES.get(days, "PPL")], minutes,
+                                       args.deadline_ms, node_budget=args.node_budget)
+            except ValueError:
+                continue
+            lat.append((time.perf_counter() - t0) * 1000.0)
+            optimal += res["optimal"]
+        print(f"{size:>8} {pct(lat, 50):>8.2f} {pct(lat, 99):>8.2f} {max(lat):>8.2f} {optimal / len(lat):>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
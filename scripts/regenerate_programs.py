@@ -0,0 +1,40 @@
+"""
+Regenerate stored programs after editing app/data/exercises.json.
+
+    git show HEAD:app/data/exercises.json > /tmp/exercises.old.json
+    python3 scripts/regenerate_programs.py --old /tmp/exercises.old.json --dry-run
+    python3 scripts/regenerate_programs.py --old /tmp/exercises.old.json --workers 8 --max-rate 20000
+
+Only users whose onboarding equipment/injuries hit the catalog diff are rebuilt;
+review-applied set adjustments are carried over. Progress goes to stderr,
+final stats (JSON) to stdout.
+"""
+from __future__ import annotations
+import argparse, json, os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import SessionLocal  # noqa: E402
+from app.services.regenerate import regenerate  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--old", required=True, help="previous exercises.json")
+    ap.add_argument("--dry-run", action="store_true")
+    ap.add_argument("--chunk-size", type=int, default=2000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--max-rate", type=float, default=0.0, help="users/s scanned, 0 = unlimited")
+    ap.add_argument("--deadline-ms", type=float, default=None,
+                    help="wall-clock cap per build (default: none, node budget only)")
+    args = ap.parse_args()
+
+    with open(args.old, "r", encoding="utf-8") as f:
+        old = json.load(f)["exercises"]
+    stats = regenerate(SessionLocal, old, dry_run=args.dry_run, chunk_size=args.chunk_size,
+                       workers=args.workers, max_rate=args.max_rate, deadline_ms=args.deadline_ms)
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os, sys
+
+# same bootstrap as scripts/: run from anywhere without installing the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite://")
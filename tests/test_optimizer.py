@@ -0,0 +1,115 @@
+import itertools
+import random
+
+import pytest
+
+from app.services import optimizer as O
+from app.services.planner import EX_POOL, build_program
+
+
+def _cost(weekly, targets):
+    total = 0
+    for m, t in targets.items():
+        diff = t - weekly.get(m, 0)
+        total += O.SHORTFALL_WEIGHT * diff * diff if diff > 0 else -O.EXCESS_WEIGHT * diff
+    return total
+
+
+def _exhaustive(pool, focuses, minutes):
+    """Best cost over every per-exercise set choice that fits each day."""
+    day_cands, _, _ = O._candidates(pool, focuses)
+    muscles = sorted(O.WEEKLY_SET_TARGETS)
+    weeks = {tuple([0] * len(muscles))}
+    for cands in day_cands:
+        # distinct per-muscle set totals one day can produce
+        day_totals = set()
+        for combo in itertools.product((0,) + O.SET_OPTIONS, repeat=len(cands)):
+            if O.WARMUP_MINUTES + sum(O.exercise_minutes(s) for s in combo) <= minutes:
+                w = [0] * len(muscles)
+                for (_, m), s in zip(cands, combo):
+                    w[muscles.index(m)] += s
+                day_totals.add(tuple(w))
+        weeks = {tuple(a + b for a, b in zip(week, day)) for week in weeks for day in day_totals}
+    return min(_cost(dict(zip(muscles, w)), O.WEEKLY_SET_TARGETS) for w in weeks)
+
+
+def test_branch_and_bound_matches_exhaustive_search():
+    rng = random.Random(3)
+    checked = 0
+    shapes = [["Push"], ["Pull"], ["Push", "Pull"], ["Push", "Push"], ["Pull", "Pull"]]
+    for _ in range(40):
+        pool = [e for e in EX_POOL if rng.random() < 0.6]
+        focuses = rng.choice(shapes)
+        minutes = rng.choice([20, 30, 45, 60, 90])
+        try:
+            res = O.optimize_program(pool, focuses, minutes, None, node_budget=10**9)
+        except ValueError:
+            continue
+        if res["fallback_days"]:
+            continue
+        assert res["optimal"]
+        assert res["cost"] == _exhaustive(pool, focuses, minutes), (focuses, minutes)
+        checked += 1
+    assert checked >= 20
+
+
+def test_branch_and_bound_on_random_instances():
+    # aggregated (day, muscle) variables, with twin days and targets above what fits
+    rng = random.Random(11)
+    for _ in range(150):
+        n_m = rng.randint(2, 4)
+        shapes = [sorted(rng.sample(range(n_m), rng.randint(1, min(3, n_m)))) for _ in range(rng.randint(1, 2))]
+        days = [rng.choice(shapes) for _ in range(rng.randint(1, 3))]
+        var_day, var_mus, var_opts = [], [], []
+        for d, ms in enumerate(days):
+            for m in ms:
+                var_day.append(d)
+                var_mus.append(m)
+                var_opts.append((0,) + tuple(range(2, rng.choice([4, 8]) + 1)))
+        twins = [next((j for j in range(d - 1, -1, -1) if days[j] == days[d]), -1) for d in range(len(days))]
+        target = [rng.randint(0, 18) for _ in range(n_m)]
+        budget = rng.choice([12, 20, 30, 45, 60])
+        limits = {"nodes": 0, "node_budget": 10**9, "deadline": None}
+        _, cost, stopped = O._branch_and_bound(var_day, var_mus, var_opts, twins, target, budget, limits)
+
+        weeks = {tuple([0] * n_m)}
+        for d in range(len(days)):
+            ks = [k for k in range(len(var_day)) if var_day[k] == d]
+            day_totals = set()
+            for combo in itertools.product(*(var_opts[k] for k in ks)):
+                if any(combo) and O.WARMUP_MINUTES + sum(O.muscle_minutes(s) for s in combo) > budget:
+                    continue
+                w = [0] * n_m
+                for k, s in zip(ks, combo):
+                    w[var_mus[k]] += s
+                day_totals.add(tuple(w))
+            weeks = {tuple(a + b for a, b in zip(week, day)) for week in weeks for day in day_totals}
+        best = min(_cost(dict(enumerate(w)), dict(enumerate(target))) for w in weeks)
+        assert not stopped
+        assert cost == best, (days, target, budget)
+
+
+def test_days_fit_session_and_are_never_empty():
+    for days, minutes in itertools.product([2, 3, 4, 5, 6], [20, 45, 60, 90]):
+        prog = build_program(days, [], [], minutes)
+        for day in prog["days"]:
+            assert day["workout"]
+            used = O.WARMUP_MINUTES + sum(O.exercise_minutes(w["sets"]) for w in day["workout"])
+            assert used <= minutes or len(day["workout"]) == 1
+
+
+def test_result_does_not_depend_on_deadline():
+    for days in (3, 4, 5):
+        fast = build_program(days, ["dumbbell"], ["knee"], 60, deadline_ms=None)
+        slow = build_program(days, ["dumbbell"], ["knee"], 60, deadline_ms=10_000)
+        assert fast["days"] == slow["days"]
+
+
+@pytest.mark.parametrize("minutes", [0, -5])
+def test_non_positive_session_is_rejected(minutes):
+    with pytest.raises(ValueError):
+        build_program(3, [], [], minutes)
+
+
+def test_huge_session_is_capped():
+    assert build_program(3, [], [], 10**6)["days"] == build_program(3, [], [], 240)["days"]
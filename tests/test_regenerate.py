@@ -0,0 +1,139 @@
+import copy
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Onboarding, Program, User
+from app.services import regenerate as R
+from app.services.planner import (
+    CATALOG_VERSION, EX_POOL, LEGACY_FLAT_SETS, adjustment_key, build_program, legacy_set_adjustments,
+)
+
+
+def _old_catalog():
+    # the previous catalog let knee-injured users do every quads exercise
+    old = copy.deepcopy(EX_POOL)
+    for e in old:
+        e["injury_exclude"] = [t for t in e.get("injury_exclude", []) if t != "knee"]
+    return old
+
+
+def _stored_plan(days_per_week, injuries):
+    plan = build_program(days_per_week, [], injuries, 60)
+    plan["catalog_version"] = "old"
+    plan["days"][1]["workout"][0]["exercise"] = "Retired Exercise"
+    first = plan["days"][0]["workout"][0]
+    first["sets"] += 1
+    plan["set_adjustments"] = {adjustment_key(1, first["exercise"]): 1}
+    plan["nutrition"] = {"current_calories": 2100}
+    return plan
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'regen.db'}", future=True)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine, future=True)
+
+
+def _seed(session_factory, uid, days_per_week, injuries, plan):
+    with session_factory() as db:
+        db.add(User(id=uid, email=f"u{uid}@example.com"))
+        db.add(Onboarding(user_id=uid, days_per_week=days_per_week, session_minutes=60,
+                          equipment="", injuries=json.dumps(injuries)))
+        db.add(Program(user_id=uid, split=plan["split"], plan_json=json.dumps(plan)))
+        db.commit()
+
+
+def _plan(session_factory, uid):
+    with session_factory() as db:
+        row = db.query(Program).filter(Program.user_id == uid).one()
+        return row.split, json.loads(row.plan_json)
+
+
+def test_merge_plan_reapplies_adjustments():
+    old = _stored_plan(4, ["knee"])
+    merged = R.merge_plan(old, build_program(4, [], ["knee"], 60))
+    first = merged["days"][0]["workout"][0]
+    fresh = build_program(4, [], ["knee"], 60)["days"][0]["workout"][0]
+    assert first["sets"] == fresh["sets"] + 1
+    assert merged["set_adjustments"] == old["set_adjustments"]
+    assert merged["nutrition"] == {"current_calories": 2100}
+    assert merged["catalog_version"] == CATALOG_VERSION
+
+
+def test_legacy_adjustments_only_for_flat_plans():
+    flat = {"days": [{"day": 1, "workout": [{"exercise": "A", "sets": LEGACY_FLAT_SETS + 1},
+                                            {"exercise": "B", "sets": LEGACY_FLAT_SETS}]}]}
+    assert legacy_set_adjustments(flat) == {"1:A": 1}
+    optimized = build_program(4, [], [], 60)
+    optimized.pop("catalog_version")
+    assert legacy_set_adjustments(optimized) == {}
+    assert R.merge_plan({"days": []}, build_program(4, [], [], 60))["set_adjustments"] == {}
+
+
+def test_regenerate_rewrites_affected_programs(session_factory):
+    _seed(session_factory, 1, 4, ["knee"], _stored_plan(4, ["knee"]))
+    _seed(session_factory, 2, 4, [], _stored_plan(4, []))
+    # days_per_week changed since the program was stored (ULx2 -> PPL)
+    _seed(session_factory, 3, 3, ["knee"], _stored_plan(4, ["knee"]))
+    untouched = _plan(session_factory, 2)
+
+    stats = R.regenerate(session_factory, _old_catalog(), log=lambda msg: None)
+    assert stats["written"] == 2 and stats["conflicts"] == 0
+
+    split, plan = _plan(session_factory, 1)
+    assert plan["catalog_version"] == CATALOG_VERSION
+    assert plan["nutrition"] == {"current_calories": 2100}
+    assert plan["days"][0]["workout"][0]["sets"] == build_program(4, [], ["knee"], 60)["days"][0]["workout"][0]["sets"] + 1
+    assert _plan(session_factory, 2) == untouched
+    split, plan = _plan(session_factory, 3)
+    assert split == plan["split"] == "PPL"
+
+    # re-running is a no-op
+    assert R.regenerate(session_factory, _old_catalog(), log=lambda msg: None)["written"] == 0
+
+
+def _concurrent_review(session_factory, monkeypatch, times):
+    """Commit a review-style plan_json change right after the pipeline reads the row."""
+    latest = R._latest_programs
+    calls = {"n": 0}
+
+    def racing(db, user_ids):
+        progs = latest(db, user_ids)
+        if calls["n"] < times:
+            calls["n"] += 1
+            with session_factory() as other:
+                row = other.query(Program).filter(Program.user_id == 1).one()
+                plan = json.loads(row.plan_json)
+                plan["nutrition"]["current_calories"] -= 150
+                row.plan_json = json.dumps(plan)
+                other.commit()
+        return progs
+
+    monkeypatch.setattr(R, "_latest_programs", racing)
+
+
+def test_concurrent_review_is_not_overwritten(session_factory, monkeypatch):
+    _seed(session_factory, 1, 4, ["knee"], _stored_plan(4, ["knee"]))
+    _concurrent_review(session_factory, monkeypatch, times=1)
+
+    stats = R.regenerate(session_factory, _old_catalog(), log=lambda msg: None)
+    assert stats["written"] == 1 and stats["conflicts"] == 0
+    _, plan = _plan(session_factory, 1)
+    assert plan["catalog_version"] == CATALOG_VERSION
+    assert plan["nutrition"]["current_calories"] == 1950
+
+
+def test_persistent_conflict_is_reported(session_factory, monkeypatch):
+    _seed(session_factory, 1, 4, ["knee"], _stored_plan(4, ["knee"]))
+    _concurrent_review(session_factory, monkeypatch, times=R.WRITE_ATTEMPTS)
+
+    stats = R.regenerate(session_factory, _old_catalog(), log=lambda msg: None)
+    assert stats["written"] == 0 and stats["conflicts"] == 1
+    _, plan = _plan(session_factory, 1)
+    assert plan["catalog_version"] == "old"
+    assert plan["nutrition"]["current_calories"] == 2100 - 150 * R.WRITE_ATTEMPTS